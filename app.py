@@ -1,7 +1,10 @@
 """Streamlit chatbot frontend."""
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import time
 from datetime import datetime
 from typing import Optional
 
@@ -15,6 +18,9 @@ st.set_page_config(
 
 # API Configuration
 API_URL = "http://localhost:8000"
+REQUEST_TIMEOUT = (3, 30)  # (connect, read) seconds
+CONVERSATIONS_TTL = 5  # seconds before the conversation list is revalidated
+MESSAGE_PAGE_SIZE = 50  # messages fetched per conversation page
 if "api_url" not in st.session_state:
     st.session_state.api_url = API_URL
 
@@ -24,25 +30,41 @@ if "token" not in st.session_state:
     st.session_state.user_id = None
     st.session_state.current_conversation_id = None
     st.session_state.conversations = []
+    st.session_state.conversations_etag = None
+    st.session_state.conversations_fetched_at = 0.0
     st.session_state.messages = []
+    st.session_state.has_older_messages = False
+
+
+@st.cache_resource
+def _session() -> requests.Session:
+    """Shared HTTP session so calls to the API reuse keep-alive connections."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=10,
+        max_retries=Retry(total=2, backoff_factor=0.1),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Content-Type": "application/json"})
+    return session
 
 
 def get_headers():
     """Get authorization headers with token."""
     if st.session_state.token:
-        return {
-            "Authorization": f"Bearer {st.session_state.token}",
-            "Content-Type": "application/json"
-        }
-    return {"Content-Type": "application/json"}
+        return {"Authorization": f"Bearer {st.session_state.token}"}
+    return {}
 
 
 def register_user(username: str, email: str, password: str) -> bool:
     """Register a new user."""
     try:
-        response = requests.post(
+        response = _session().post(
             f"{st.session_state.api_url}/auth/register",
-            json={"username": username, "email": email, "password": password}
+            json={"username": username, "email": email, "password": password},
+            timeout=REQUEST_TIMEOUT
         )
         
         if response.status_code == 200:
@@ -61,9 +83,10 @@ def register_user(username: str, email: str, password: str) -> bool:
 def login_user(email: str, password: str) -> bool:
     """Login a user."""
     try:
-        response = requests.post(
+        response = _session().post(
             f"{st.session_state.api_url}/auth/login",
-            json={"email": email, "password": password}
+            json={"email": email, "password": password},
+            timeout=REQUEST_TIMEOUT
         )
         
         if response.status_code == 200:
@@ -85,16 +108,20 @@ def logout_user():
     st.session_state.user_id = None
     st.session_state.current_conversation_id = None
     st.session_state.conversations = []
+    st.session_state.conversations_etag = None
+    st.session_state.conversations_fetched_at = 0.0
     st.session_state.messages = []
+    st.session_state.has_older_messages = False
 
 
 def create_conversation(title: str = "New Conversation") -> Optional[int]:
     """Create a new conversation."""
     try:
-        response = requests.post(
+        response = _session().post(
             f"{st.session_state.api_url}/chat/conversations",
             json={"title": title},
-            headers=get_headers()
+            headers=get_headers(),
+            timeout=REQUEST_TIMEOUT
         )
         
         if response.status_code == 200:
@@ -108,64 +135,175 @@ def create_conversation(title: str = "New Conversation") -> Optional[int]:
         return None
 
 
-def load_conversations():
-    """Load all conversations for the user."""
+def load_conversations(force: bool = False):
+    """
+    Load all conversations for the user.
+    
+    The list is reused for CONVERSATIONS_TTL seconds, then revalidated with
+    the server's ETag so an unchanged list comes back as an empty 304.
+    """
+    if not force and time.monotonic() - st.session_state.conversations_fetched_at < CONVERSATIONS_TTL:
+        return
+    
+    headers = get_headers()
+    if st.session_state.conversations_etag:
+        headers["If-None-Match"] = st.session_state.conversations_etag
+    
     try:
-        response = requests.get(
+        response = _session().get(
             f"{st.session_state.api_url}/chat/conversations",
-            headers=get_headers()
+            headers=headers,
+            timeout=REQUEST_TIMEOUT
         )
         
-        if response.status_code == 200:
+        if response.status_code == 304:
+            st.session_state.conversations_fetched_at = time.monotonic()
+        elif response.status_code == 200:
             st.session_state.conversations = response.json()
+            st.session_state.conversations_etag = response.headers.get("ETag")
+            st.session_state.conversations_fetched_at = time.monotonic()
         else:
             st.error("Failed to load conversations")
     except Exception as e:
         st.error(f"Error loading conversations: {str(e)}")
 
 
-def load_conversation_messages(conversation_id: int):
-    """Load messages for a specific conversation."""
+def _fetch_messages(conversation_id: int, before_id: Optional[int] = None) -> Optional[list]:
+    """Fetch one page of a conversation's messages, oldest first."""
+    params = {"limit": MESSAGE_PAGE_SIZE}
+    if before_id is not None:
+        params["before_id"] = before_id
+    
     try:
-        response = requests.get(
+        response = _session().get(
             f"{st.session_state.api_url}/chat/conversations/{conversation_id}",
-            headers=get_headers()
+            params=params,
+            headers=get_headers(),
+            timeout=REQUEST_TIMEOUT
         )
         
         if response.status_code == 200:
-            data = response.json()
-            st.session_state.messages = data["messages"]
-            st.session_state.current_conversation_id = conversation_id
-        else:
-            st.error("Failed to load conversation")
+            return response.json()["messages"]
+        st.error("Failed to load conversation")
     except Exception as e:
         st.error(f"Error loading conversation: {str(e)}")
+    return None
+
+
+def load_conversation_messages(conversation_id: int):
+    """Load the most recent messages for a specific conversation."""
+    messages = _fetch_messages(conversation_id)
+    if messages is not None:
+        st.session_state.messages = messages
+        st.session_state.current_conversation_id = conversation_id
+        # A full page means there may be more history before it
+        st.session_state.has_older_messages = len(messages) == MESSAGE_PAGE_SIZE
+
+
+def load_older_messages():
+    """Prepend the page of messages before the oldest one shown."""
+    if not st.session_state.messages:
+        return
+    
+    messages = _fetch_messages(
+        st.session_state.current_conversation_id,
+        before_id=st.session_state.messages[0]["id"]
+    )
+    if messages is not None:
+        st.session_state.messages = messages + st.session_state.messages
+        st.session_state.has_older_messages = len(messages) == MESSAGE_PAGE_SIZE
+
+
+def _error_detail(response) -> str:
+    """Get the error message from an API error response."""
+    try:
+        data = response.json()
+    except ValueError:
+        return "Unknown error"
+    # Rate limit responses carry "error" rather than FastAPI's "detail"
+    return data.get("detail") or data.get("error") or "Unknown error"
+
+
+def render_message(msg: dict):
+    """Render a single chat message bubble."""
+    with st.chat_message(msg["role"]):
+        st.write(msg["content"])
+
+
+def _iter_sse(response):
+    """Yield (event, data) pairs from a Server-Sent Events response."""
+    event = "message"
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            event = "message"
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            yield event, json.loads(line[len("data:"):].strip())
 
 
 def send_message(user_message: str) -> Optional[str]:
-    """Send a message and get AI response."""
+    """Send a message and render the AI response as it streams in."""
     if not st.session_state.current_conversation_id:
         st.error("No conversation selected")
         return None
     
     try:
-        response = requests.post(
-            f"{st.session_state.api_url}/chat/conversations/{st.session_state.current_conversation_id}/messages",
+        with _session().post(
+            f"{st.session_state.api_url}/chat/conversations/{st.session_state.current_conversation_id}/messages/stream",
             json={
                 "conversation_id": st.session_state.current_conversation_id,
                 "message": user_message
             },
-            headers=get_headers()
-        )
+            headers=get_headers(),
+            timeout=REQUEST_TIMEOUT,
+            stream=True
+        ) as response:
+            if response.status_code != 200:
+                st.error(f"Failed to send message: {_error_detail(response)}")
+                return None
+            
+            render_message({"role": "user", "content": user_message})
+            
+            with st.chat_message("assistant"):
+                placeholder = st.empty()
+                assistant_message = ""
+                done = {}
+                failed = False
+                for event, data in _iter_sse(response):
+                    if event == "error":
+                        st.error(f"Failed to send message: {data.get('detail', 'Unknown error')}")
+                        done, failed = data, True
+                        break
+                    if event == "done":
+                        done = data
+                        break
+                    assistant_message += data["delta"]
+                    placeholder.markdown(assistant_message + "▌")
+                placeholder.markdown(assistant_message)
+                
+                if not done:
+                    st.error("Failed to send message: the response ended unexpectedly")
+                    failed = True
         
-        if response.status_code == 200:
-            data = response.json()
-            # Reload messages to get updated conversation
-            load_conversation_messages(st.session_state.current_conversation_id)
-            return data["assistant_message"]
-        else:
-            st.error(f"Failed to send message: {response.json().get('detail', 'Unknown error')}")
+        # Only keep turns the server saved, including partial failed replies
+        if "message_id" not in done:
             return None
+        
+        # A replayed duplicate is already in the local history
+        if done.get("duplicate"):
+            return assistant_message
+        
+        # Append the new turn locally instead of reloading the conversation
+        st.session_state.messages.append(
+            {"id": done.get("user_message_id"), "role": "user", "content": user_message}
+        )
+        st.session_state.messages.append(
+            {"id": done.get("message_id"), "role": "assistant", "content": assistant_message}
+        )
+        # The conversation moved to the top; revalidate the list on next run
+        st.session_state.conversations_fetched_at = 0.0
+        return None if failed else assistant_message
     except Exception as e:
         st.error(f"Error sending message: {str(e)}")
         return None
@@ -174,13 +312,14 @@ def send_message(user_message: str) -> Optional[str]:
 def delete_conversation(conversation_id: int) -> bool:
     """Delete a conversation."""
     try:
-        response = requests.delete(
+        response = _session().delete(
             f"{st.session_state.api_url}/chat/conversations/{conversation_id}",
-            headers=get_headers()
+            headers=get_headers(),
+            timeout=REQUEST_TIMEOUT
         )
         
         if response.status_code == 200:
-            load_conversations()
+            load_conversations(force=True)
             if st.session_state.current_conversation_id == conversation_id:
                 st.session_state.current_conversation_id = None
                 st.session_state.messages = []
@@ -252,7 +391,7 @@ def main():
             if st.button("➕ New Conversation", key="new_conv_button"):
                 conv_id = create_conversation()
                 if conv_id:
-                    load_conversations()
+                    load_conversations(force=True)
                     load_conversation_messages(conv_id)
                     st.rerun()
             
@@ -280,31 +419,19 @@ def main():
         if st.session_state.current_conversation_id:
             st.subheader(f"Conversation #{st.session_state.current_conversation_id}")
             
-            # Display messages
-            message_container = st.container()
-            
-            with message_container:
-                for msg in st.session_state.messages:
-                    if msg["role"] == "user":
-                        with st.chat_message("user"):
-                            st.write(msg["content"])
-                    else:
-                        with st.chat_message("assistant"):
-                            st.write(msg["content"])
-            
-            st.divider()
+            if st.session_state.has_older_messages and st.button(
+                "Load older messages", key="load_older_button"
+            ):
+                load_older_messages()
+                st.rerun()
             
-            # Input area
-            user_input = st.text_input("Type your message...", key="user_input")
+            # Display messages
+            for msg in st.session_state.messages:
+                render_message(msg)
             
-            col1, col2 = st.columns([4, 1])
-            with col2:
-                if st.button("Send", key="send_button"):
-                    if user_input:
-                        with st.spinner("Generating response..."):
-                            response = send_message(user_input)
-                            if response:
-                                st.rerun()
+            # Input area; the new turn is rendered and appended in place
+            if user_input := st.chat_input("Type your message..."):
+                send_message(user_input)
         else:
             st.info("👈 Select a conversation from the sidebar or create a new one")
 
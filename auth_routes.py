@@ -1,12 +1,14 @@
 """Authentication routes for user registration and login."""
 from fastapi import APIRouter, HTTPException, status, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
 from app.config.database import get_db
 from app.models.models import User
 from app.services.auth_service import (
-    hash_password,
-    verify_password,
+    ahash_password,
+    averify_password,
     create_access_token,
 )
 
@@ -34,7 +36,7 @@ class TokenResponse(BaseModel):
 
 
 @router.post("/register", response_model=TokenResponse)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
     """
     Register a new user.
     
@@ -49,9 +51,11 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         HTTPException: If user already exists
     """
     # Check if user exists
-    existing_user = db.query(User).filter(
-        (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    existing_user = (await db.execute(
+        select(User).where(
+            or_(User.email == user_data.email, User.username == user_data.username)
+        )
+    )).scalars().first()
     
     if existing_user:
         raise HTTPException(
@@ -60,7 +64,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await ahash_password(user_data.password)
     user = User(
         username=user_data.username,
         email=user_data.email,
@@ -68,12 +72,23 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    
+    # Flush to get the user ID from INSERT ... RETURNING; no refresh needed
+    try:
+        await db.flush()
+    except IntegrityError:
+        # Lost a race with a concurrent registration for the same user
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User with this email or username already exists"
+        )
     
     # Generate token
     access_token = create_access_token(data={"sub": str(user.id)})
     
+    await db.commit()
+    
     return {
         "access_token": access_token,
         "token_type": "bearer",
@@ -82,7 +97,7 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
     """
     Login a user.
     
@@ -97,9 +112,13 @@ async def login(user_data: UserLogin, db: Session = Depends(get_db)):
         HTTPException: If credentials are invalid
     """
     # Find user by email
-    user = db.query(User).filter(User.email == user_data.email).first()
+    user = (await db.execute(
+        select(User).where(User.email == user_data.email)
+    )).scalar_one_or_none()
+    
+    hashed_password = user.hashed_password if user else None
     
-    if not user or not verify_password(user_data.password, user.hashed_password):
+    if not await averify_password(user_data.password, hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
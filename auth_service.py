@@ -1,16 +1,40 @@
 """Authentication utilities for JWT token management."""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthCredentials
 from app.config.settings import settings
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+)
 security = HTTPBearer()
 
+# Bcrypt is CPU bound, so async callers run it on a dedicated thread pool
+_password_pool = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1,
+    thread_name_prefix="password-hash",
+)
+
+# Checked against when a user doesn't exist so failed logins take equally long
+_DUMMY_HASH = pwd_context.hash("dummy-password")
+
+# Verified tokens -> (user ID, expiry timestamp), least recently used first.
+# verify_token runs in FastAPI's thread pool, hence the lock.
+_token_cache: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt."""
@@ -22,6 +46,36 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def ahash_password(password: str) -> str:
+    """Hash a password without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_pool, hash_password, password)
+
+
+async def averify_password(plain_password: str, hashed_password: Optional[str]) -> bool:
+    """
+    Verify a password without blocking the event loop.
+    
+    Args:
+        plain_password: Password supplied by the client
+        hashed_password: Stored hash, or None if the user doesn't exist
+        
+    Returns:
+        True if the password matches. A missing hash is still checked
+        against a dummy hash, so the result always takes a full bcrypt round.
+    """
+    loop = asyncio.get_running_loop()
+    
+    if hashed_password is None:
+        await loop.run_in_executor(_password_pool, verify_password, plain_password, _DUMMY_HASH)
+        return False
+    
+    # passlib compares digests in constant time
+    return await loop.run_in_executor(
+        _password_pool, verify_password, plain_password, hashed_password
+    )
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
     Create a JWT access token.
@@ -51,11 +105,61 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def verify_token(credentials: HTTPAuthCredentials = Depends(security)) -> str:
+def _decode_token(token: str) -> Optional[int]:
+    """
+    Decode an access token, reusing earlier results until the token expires.
+    
+    Args:
+        token: Encoded JWT
+        
+    Returns:
+        User ID from the token, or None if it has no subject
+        
+    Raises:
+        JWTError: If the token is invalid or expired
+    """
+    now = time.time()
+    
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+        if cached is not None:
+            if cached[1] > now:
+                _token_cache.move_to_end(token)
+                return cached[0]
+            del _token_cache[token]
+    
+    payload = jwt.decode(
+        token,
+        settings.SECRET_KEY,
+        algorithms=[settings.ALGORITHM]
+    )
+    user_id = payload.get("sub")
+    
+    if user_id is None:
+        return None
+    
+    user_id = int(user_id)
+    
+    # Tokens from create_access_token always carry an expiry; others aren't cached
+    expires_at = payload.get("exp")
+    if expires_at is not None:
+        with _token_cache_lock:
+            if token not in _token_cache and len(_token_cache) >= settings.TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+            _token_cache[token] = (user_id, float(expires_at))
+    
+    return user_id
+
+
+def verify_token(request: Request, credentials: HTTPAuthCredentials = Depends(security)) -> int:
     """
     Verify a JWT token from request header.
     
+    The user ID is also stored on ``request.state`` so per-user rate limits
+    can key on it.
+    
     Args:
+        request: Incoming request
         credentials: HTTP Bearer credentials from request
         
     Returns:
@@ -67,12 +171,7 @@ def verify_token(credentials: HTTPAuthCredentials = Depends(security)) -> str:
     token = credentials.credentials
     
     try:
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
+        user_id = _decode_token(token)
         
         if user_id is None:
             raise HTTPException(
@@ -80,8 +179,9 @@ def verify_token(credentials: HTTPAuthCredentials = Depends(security)) -> str:
                 detail="Invalid authentication credentials",
             )
         
-        return int(user_id)
-    except JWTError:
+        request.state.user_id = user_id
+        return user_id
+    except (JWTError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
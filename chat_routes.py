@@ -1,16 +1,27 @@
 """Chat routes for conversation and message management."""
-from fastapi import APIRouter, HTTPException, status, Depends
-from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List
-from datetime import datetime
-from app.config.database import get_db
-from app.models.models import User, Conversation, Message
+import hashlib
+import json
+import anyio
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status, Depends, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from slowapi import Limiter
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from typing import List, NamedTuple, Optional, Tuple
+from datetime import datetime, timedelta
+from app.config.database import AsyncSessionLocal, get_db
+from app.config.settings import settings
+from app.models.models import Conversation, Message
 from app.services.auth_service import verify_token
 from app.services.gen_ai_service import gen_ai_service
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+# Keyed on the user ID that verify_token stores on the request
+limiter = Limiter(key_func=lambda request: str(request.state.user_id))
+
 
 class MessageCreate(BaseModel):
     """Schema for creating a message."""
@@ -25,8 +36,7 @@ class MessageResponse(BaseModel):
     content: str
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ConversationCreate(BaseModel):
@@ -41,8 +51,7 @@ class ConversationResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ConversationDetailResponse(ConversationResponse):
@@ -62,137 +71,527 @@ class ChatResponse(BaseModel):
     message_id: int
 
 
+# Built once so listing conversations doesn't rebuild the validator per call
+_conversation_list_adapter = TypeAdapter(List[ConversationResponse])
+
+# Appended to replies cut off mid-stream so neither the user nor the model
+# mistakes them for complete answers
+_INTERRUPTED_NOTE = "\n\n[Response interrupted]"
+
+# Keep proxies from caching or buffering Server-Sent Events
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+class _PreparedTurn(NamedTuple):
+    """State a chat turn needs before it calls the model."""
+    conversation: Conversation
+    # Stored (user message, reply) if this send repeats the previous turn;
+    # the remaining fields are then unset
+    duplicate: Optional[Tuple[Message, Message]]
+    user_message: Optional[Message] = None
+    history: str = ""
+    history_count: int = 0
+
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    """Encode a payload as a single Server-Sent Events frame."""
+    frame = f"event: {event}\n" if event else ""
+    return f"{frame}data: {json.dumps(data)}\n\n"
+
+
+async def _get_conversation(db: AsyncSession, conversation_id: int, user_id: int) -> Conversation:
+    """
+    Get a conversation, verifying ownership.
+    
+    Raises:
+        HTTPException: If the conversation doesn't exist or belongs to another user
+    """
+    conversation = (await db.execute(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == user_id
+        )
+    )).scalar_one_or_none()
+    
+    if not conversation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found"
+        )
+    
+    return conversation
+
+
+def _clean_message(message: str) -> str:
+    """
+    Strip a user message and check it is worth sending to the model.
+    
+    Raises:
+        HTTPException: If the message is blank or too long
+    """
+    message = message.strip()
+    
+    if not message:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Message cannot be empty"
+        )
+    
+    if len(message) > settings.MAX_MESSAGE_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Message exceeds {settings.MAX_MESSAGE_LENGTH} characters"
+        )
+    
+    return message
+
+
+async def _find_duplicate_turn(
+    db: AsyncSession,
+    conversation_id: int,
+    content: str
+) -> Optional[Tuple[Message, Message]]:
+    """
+    Find the stored turn for an accidental double-send of ``content``.
+    
+    Returns:
+        Tuple of (user message, assistant reply) if the latest turn asked the
+        same thing within DUPLICATE_MESSAGE_WINDOW_SECONDS, otherwise None
+    """
+    last_two = (await db.execute(
+        select(Message)
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.id.desc())
+        .limit(2)
+    )).scalars().all()
+    
+    if len(last_two) < 2:
+        return None
+    
+    reply, previous = last_two
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.DUPLICATE_MESSAGE_WINDOW_SECONDS)
+    if (
+        reply.role == "assistant"
+        and previous.role == "user"
+        and previous.content == content
+        and previous.created_at >= cutoff
+    ):
+        return previous, reply
+    
+    return None
+
+
+async def _load_history(
+    db: AsyncSession,
+    conversation: Conversation,
+    background_tasks: BackgroundTasks
+) -> Tuple[str, int]:
+    """
+    Get the formatted prompt history for a conversation.
+    
+    Reuses the transcript cached on the conversation while it still ends at
+    the latest stored message; otherwise rebuilds it from the last
+    CHAT_HISTORY_WINDOW messages. The cache grows by one turn per message
+    and is rebuilt once it spans twice the window, so the model sees
+    between CHAT_HISTORY_WINDOW and 2 * CHAT_HISTORY_WINDOW - 1 of the most
+    recent messages (fewer only in short conversations). Messages that will
+    fall out of the window are folded into the conversation summary in the
+    background one turn before the rebuild, so the rebuilt prompt's summary
+    already covers them; the rebuild itself schedules a catch-up pass.
+    
+    Returns:
+        Tuple of (transcript, number of messages it covers)
+    """
+    # Single seek on ix_messages_conv_id
+    last_message_id = (await db.execute(
+        select(Message.id)
+        .where(Message.conversation_id == conversation.id)
+        .order_by(Message.id.desc())
+        .limit(1)
+    )).scalar()
+    
+    if (
+        conversation.cached_prompt is not None
+        and conversation.cached_up_to_message_id == last_message_id
+        and conversation.cached_message_count < 2 * settings.CHAT_HISTORY_WINDOW
+    ):
+        if conversation.cached_message_count + 2 >= 2 * settings.CHAT_HISTORY_WINDOW:
+            # The next turn rebuilds from this turn's two messages plus the
+            # newest CHAT_HISTORY_WINDOW - 2 stored now; summarize the rest ahead
+            window_start_id = (await db.execute(
+                select(Message.id)
+                .where(Message.conversation_id == conversation.id)
+                .order_by(Message.id.desc())
+                .offset(max(settings.CHAT_HISTORY_WINDOW - 3, 0))
+                .limit(1)
+            )).scalar()
+            if window_start_id is not None:
+                background_tasks.add_task(_summarize_older_messages, conversation.id, window_start_id)
+        
+        return conversation.cached_prompt, conversation.cached_message_count
+    
+    # Get the most recent conversation history
+    messages = (await db.execute(
+        select(Message)
+        .where(Message.conversation_id == conversation.id)
+        .order_by(Message.id.desc())
+        .limit(settings.CHAT_HISTORY_WINDOW)
+    )).scalars().all()[::-1]
+    
+    if len(messages) == settings.CHAT_HISTORY_WINDOW:
+        background_tasks.add_task(_summarize_older_messages, conversation.id, messages[0].id)
+    
+    # Format for Gen AI
+    transcript = gen_ai_service.format_transcript([
+        {"role": msg.role, "content": msg.content}
+        for msg in messages
+    ])
+    return transcript, len(messages)
+
+
+def _with_summary(conversation: Conversation, history: str) -> str:
+    """Prefix prompt history with the summary of turns outside the window."""
+    if not conversation.summary:
+        return history
+    
+    summary = gen_ai_service.format_transcript([
+        {"role": "system", "content": f"Summary of the earlier conversation: {conversation.summary}"}
+    ])
+    return f"{summary}\n{history}" if history else summary
+
+
+async def _summarize_older_messages(conversation_id: int, window_start_id: int) -> None:
+    """
+    Fold messages older than the history window into the conversation summary.
+    
+    Runs as a background task with its own session. Failures are ignored;
+    the next history rebuild schedules another attempt.
+    """
+    async with AsyncSessionLocal() as db:
+        conversation = await db.get(Conversation, conversation_id)
+        if conversation is None:
+            return
+        
+        summarized_upto = conversation.summary_upto_message_id or 0
+        messages = (await db.execute(
+            select(Message)
+            .where(
+                Message.conversation_id == conversation_id,
+                Message.id > summarized_upto,
+                Message.id < window_start_id
+            )
+            .order_by(Message.id)
+            .limit(settings.CHAT_SUMMARY_BATCH_SIZE)
+        )).scalars().all()
+        
+        if not messages:
+            return
+        
+        # Release the connection before the (slow) summary call
+        await db.commit()
+        
+        try:
+            summary = await gen_ai_service.summarize(
+                [{"role": msg.role, "content": msg.content} for msg in messages],
+                conversation.summary
+            )
+        except Exception:
+            return
+        
+        # Keep updated_at as is; a summary isn't user activity
+        await db.execute(
+            update(Conversation)
+            .where(
+                Conversation.id == conversation_id,
+                func.coalesce(Conversation.summary_upto_message_id, 0) == summarized_upto
+            )
+            .values(
+                summary=summary,
+                summary_upto_message_id=messages[-1].id,
+                updated_at=Conversation.updated_at
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+
+async def _prepare_turn(
+    db: AsyncSession,
+    conversation_id: int,
+    user_id: int,
+    message: str,
+    background_tasks: BackgroundTasks
+) -> _PreparedTurn:
+    """
+    Validate a message and load everything its turn needs from the database.
+    
+    Ends the read transaction before returning, so no connection is held
+    while the model works.
+    
+    Raises:
+        HTTPException: If the message is invalid or the conversation isn't found
+    """
+    content = _clean_message(message)
+    conversation = await _get_conversation(db, conversation_id, user_id)
+    
+    duplicate = await _find_duplicate_turn(db, conversation_id, content)
+    if duplicate is not None:
+        return _PreparedTurn(conversation, duplicate)
+    
+    history, history_count = await _load_history(db, conversation, background_tasks)
+    user_message = Message(
+        conversation_id=conversation_id,
+        role="user",
+        content=content,
+        created_at=datetime.utcnow()
+    )
+    
+    await db.commit()
+    
+    return _PreparedTurn(conversation, None, user_message, history, history_count)
+
+
+async def _save_turn(
+    db: AsyncSession,
+    conversation: Conversation,
+    user_message: Message,
+    content: str,
+    history: str,
+    history_count: int
+) -> Optional[Message]:
+    """
+    Save a user message and its assistant reply in one short transaction.
+    
+    Runs after the model call, so no row lock or pooled connection is held
+    while the reply is generated. The same commit bumps the conversation's
+    ``updated_at`` and extends its cached prompt with the new turn. If
+    another turn was saved since ``history`` was read, the cache is
+    invalidated instead, so the next message rebuilds it.
+    
+    Returns:
+        The saved assistant message, or None if the conversation was
+        deleted in the meantime
+    """
+    # Append this turn to the cached prompt instead of rebuilding it next time
+    cached_prompt = gen_ai_service.format_transcript(
+        [
+            {"role": user_message.role, "content": user_message.content},
+            {"role": "assistant", "content": content},
+        ],
+        history,
+    )
+    
+    assistant_message = Message(
+        conversation_id=conversation.id,
+        role="assistant",
+        content=content
+    )
+    db.add_all([user_message, assistant_message])
+    
+    # Flush to get the assistant message ID the cache points at
+    try:
+        await db.flush()
+    except IntegrityError:
+        # The conversation was deleted while the reply was generated
+        await db.rollback()
+        return None
+    
+    now = datetime.utcnow()
+    extended = await db.execute(
+        update(Conversation)
+        .where(
+            Conversation.id == conversation.id,
+            Conversation.cached_up_to_message_id.is_not_distinct_from(
+                conversation.cached_up_to_message_id
+            )
+        )
+        .values(
+            updated_at=now,
+            cached_prompt=cached_prompt,
+            cached_up_to_message_id=assistant_message.id,
+            cached_message_count=history_count + 2
+        )
+        .execution_options(synchronize_session=False)
+    )
+    
+    if extended.rowcount == 0:
+        # A concurrent turn was saved first. Drop the prompt and point the
+        # cache at this turn so every other stale reader fails the check too.
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation.id)
+            .values(
+                updated_at=now,
+                cached_prompt=None,
+                cached_up_to_message_id=assistant_message.id
+            )
+            .execution_options(synchronize_session=False)
+        )
+    
+    await db.commit()
+    
+    return assistant_message
+
+
 @router.post("/conversations", response_model=ConversationResponse)
 async def create_conversation(
     data: ConversationCreate,
     user_id: int = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new conversation for the user."""
-    user = db.query(User).filter(User.id == user_id).first()
+    conversation = Conversation(user_id=user_id, title=data.title)
+    db.add(conversation)
     
-    if not user:
+    # The users foreign key rejects tokens for users that no longer exist
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    conversation = Conversation(user_id=user_id, title=data.title)
-    db.add(conversation)
-    db.commit()
-    db.refresh(conversation)
-    
+    # ID comes back from INSERT ... RETURNING and timestamps are client-side
+    # defaults, so the object is complete without a refresh
     return conversation
 
 
 @router.get("/conversations", response_model=List[ConversationResponse])
 async def list_conversations(
+    request: Request,
     user_id: int = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """List all conversations for the user."""
-    conversations = db.query(Conversation).filter(
-        Conversation.user_id == user_id
-    ).order_by(Conversation.updated_at.desc()).all()
+    """
+    List all conversations for the user.
     
-    return conversations
+    The response carries an ETag derived from the newest ``updated_at`` and
+    the conversation count. A request whose ``If-None-Match`` matches it
+    gets an empty 304 instead of the list.
+    """
+    last_updated, count = (await db.execute(
+        select(func.max(Conversation.updated_at), func.count(Conversation.id))
+        .where(Conversation.user_id == user_id)
+    )).one()
+    
+    etag = '"' + hashlib.md5(f"{last_updated}-{count}".encode()).hexdigest() + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    conversations = (await db.execute(
+        select(Conversation)
+        .where(Conversation.user_id == user_id)
+        .order_by(Conversation.updated_at.desc())
+    )).scalars().all()
+    
+    return ORJSONResponse(
+        _conversation_list_adapter.dump_python(
+            _conversation_list_adapter.validate_python(conversations)
+        ),
+        headers={"ETag": etag},
+    )
 
 
 @router.get("/conversations/{conversation_id}", response_model=ConversationDetailResponse)
 async def get_conversation(
     conversation_id: int,
+    limit: int = Query(settings.MESSAGE_PAGE_SIZE, ge=1, le=500),
+    before_id: Optional[int] = None,
     user_id: int = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get a specific conversation with all messages."""
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == user_id
-    ).first()
+    """
+    Get a specific conversation with its most recent messages.
     
-    if not conversation:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Conversation not found"
-        )
+    Args:
+        conversation_id: ID of the conversation
+        limit: Maximum number of messages to return
+        before_id: Only return messages older than this message ID
+        user_id: Authenticated user ID
+        db: Database session
+        
+    Returns:
+        Conversation with up to ``limit`` messages, oldest first
+    """
+    conversation = await _get_conversation(db, conversation_id, user_id)
     
-    return conversation
+    query = select(Message).where(Message.conversation_id == conversation_id)
+    if before_id is not None:
+        query = query.where(Message.id < before_id)
+    
+    messages = (await db.execute(
+        query.order_by(Message.id.desc()).limit(limit)
+    )).scalars().all()[::-1]
+    
+    return {
+        "id": conversation.id,
+        "title": conversation.title,
+        "created_at": conversation.created_at,
+        "updated_at": conversation.updated_at,
+        "messages": messages,
+    }
 
 
 @router.post("/conversations/{conversation_id}/messages", response_model=ChatResponse)
+@limiter.limit(settings.MESSAGE_RATE_LIMIT)
 async def send_message(
+    request: Request,
     conversation_id: int,
     chat_request: ChatRequest,
+    background_tasks: BackgroundTasks,
     user_id: int = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Send a message and get AI response.
     
+    Resending the previous message within a few seconds returns the stored
+    reply instead of calling the model again.
+    
     Args:
+        request: Incoming request, used for rate limiting
         conversation_id: ID of the conversation
         chat_request: Message content
+        background_tasks: Tasks run after the response, e.g. summarization
         user_id: Authenticated user ID
         db: Database session
         
     Returns:
         AI response and message ID
     """
-    # Verify conversation ownership
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == user_id
-    ).first()
-    
-    if not conversation:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Conversation not found"
-        )
-    
-    # Save user message
-    user_message = Message(
-        conversation_id=conversation_id,
-        role="user",
-        content=chat_request.message
+    conversation, duplicate, user_message, history, history_count = await _prepare_turn(
+        db, conversation_id, user_id, chat_request.message, background_tasks
     )
-    db.add(user_message)
-    db.commit()
-    db.refresh(user_message)
-    
-    # Get conversation history
-    messages = db.query(Message).filter(
-        Message.conversation_id == conversation_id
-    ).order_by(Message.created_at).all()
-    
-    # Format for Gen AI
-    message_history = [
-        {"role": msg.role, "content": msg.content}
-        for msg in messages
-    ]
+    if duplicate is not None:
+        _, reply = duplicate
+        return {
+            "assistant_message": reply.content,
+            "message_id": reply.id
+        }
     
     # Get AI response
     try:
-        ai_response = await gen_ai_service.generate_response(message_history)
+        ai_response = await gen_ai_service.generate_response(
+            [{"role": user_message.role, "content": user_message.content}],
+            history=_with_summary(conversation, history),
+            user_id=user_id
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error generating response: {str(e)}"
         )
     
-    # Save assistant message
-    assistant_message = Message(
-        conversation_id=conversation_id,
-        role="assistant",
-        content=ai_response
+    assistant_message = await _save_turn(
+        db, conversation, user_message, ai_response, history, history_count
     )
-    db.add(assistant_message)
-    db.commit()
-    db.refresh(assistant_message)
-    
-    # Update conversation timestamp
-    conversation.updated_at = datetime.utcnow()
-    db.commit()
+    if assistant_message is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Conversation not found"
+        )
     
     return {
         "assistant_message": ai_response,
@@ -200,25 +599,118 @@ async def send_message(
     }
 
 
+@router.post("/conversations/{conversation_id}/messages/stream")
+@limiter.limit(settings.MESSAGE_RATE_LIMIT)
+async def stream_message(
+    request: Request,
+    conversation_id: int,
+    chat_request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    user_id: int = Depends(verify_token),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Send a message and stream the AI response as Server-Sent Events.
+    
+    Each text chunk is sent as a ``data: {"delta": ...}`` event. Once the
+    model finishes, the assembled response is saved and a final ``done``
+    event carries its ``message_id`` and the ``user_message_id``. Failures
+    are reported as an ``error`` event since the response status is
+    already committed, including when the model returns nothing and no
+    turn is saved. A reply cut off by a failure is saved with a note
+    marking it as interrupted, sent as a last delta, and the ``error``
+    event then carries the saved IDs too. A repeated send of the previous
+    message is answered with the stored reply as a single delta and a
+    ``done`` event flagged ``duplicate``.
+    
+    Args:
+        request: Incoming request, used for rate limiting
+        conversation_id: ID of the conversation
+        chat_request: Message content
+        background_tasks: Tasks run after the response, e.g. summarization
+        user_id: Authenticated user ID
+        db: Database session
+        
+    Returns:
+        ``text/event-stream`` response
+    """
+    conversation, duplicate, user_message, history, history_count = await _prepare_turn(
+        db, conversation_id, user_id, chat_request.message, background_tasks
+    )
+    if duplicate is not None:
+        previous, reply = duplicate
+        
+        async def replay_stream():
+            yield _sse({"delta": reply.content})
+            yield _sse(
+                {"message_id": reply.id, "user_message_id": previous.id, "duplicate": True},
+                event="done"
+            )
+        
+        return StreamingResponse(
+            replay_stream(),
+            media_type="text/event-stream",
+            headers=_SSE_HEADERS,
+        )
+    
+    async def event_stream():
+        chunks = []
+        complete = False
+        error = None
+        assistant_message = None
+        try:
+            async for chunk in gen_ai_service.stream_response(
+                [{"role": user_message.role, "content": user_message.content}],
+                history=_with_summary(conversation, history),
+                user_id=user_id
+            ):
+                chunks.append(chunk)
+                yield _sse({"delta": chunk})
+            complete = True
+        except Exception as e:
+            error = f"Error generating response: {str(e)}"
+        finally:
+            # Persist whatever was generated, even if the client went away,
+            # before telling the client how the stream ended
+            if chunks:
+                if not complete:
+                    chunks.append(_INTERRUPTED_NOTE)
+                with anyio.CancelScope(shield=True):
+                    assistant_message = await _save_turn(
+                        db, conversation, user_message, "".join(chunks), history, history_count
+                    )
+        
+        if error is None and assistant_message is None:
+            error = "Conversation not found" if chunks else "The model returned an empty response"
+        
+        saved = {}
+        if assistant_message is not None:
+            saved = {"message_id": assistant_message.id, "user_message_id": user_message.id}
+        
+        if error is not None:
+            if assistant_message is not None:
+                yield _sse({"delta": _INTERRUPTED_NOTE})
+            yield _sse({"detail": error, **saved}, event="error")
+        elif assistant_message is not None:
+            yield _sse(saved, event="done")
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS,
+    )
+
+
 @router.delete("/conversations/{conversation_id}")
 async def delete_conversation(
     conversation_id: int,
     user_id: int = Depends(verify_token),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a conversation and all its messages."""
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == user_id
-    ).first()
-    
-    if not conversation:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Conversation not found"
-        )
+    conversation = await _get_conversation(db, conversation_id, user_id)
     
-    db.delete(conversation)
-    db.commit()
+    await db.delete(conversation)
+    await db.commit()
     
     return {"message": "Conversation deleted successfully"}
@@ -1,31 +1,56 @@
 """Database configuration and initialization."""
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
 from app.config.settings import settings
 
+
+def _async_database_url(url: str) -> str:
+    """Point a plain postgresql:// URL at the async psycopg 3 driver."""
+    if url.startswith("postgresql://"):
+        return "postgresql+psycopg://" + url[len("postgresql://"):]
+    return url
+
+
 # Create database engine
-engine = create_engine(
-    settings.DATABASE_URL,
+engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL),
     echo=settings.DEBUG,
     pool_pre_ping=True,  # Verify connections before using them
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    query_cache_size=1200,  # Reuse compiled SQL for parameterized queries
 )
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 # Base class for all models
 Base = declarative_base()
 
+# create_all only creates missing tables, so columns and indexes added to
+# existing tables are applied here. Each statement is a no-op once applied.
+_SCHEMA_UPGRADES = (
+    "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS cached_prompt TEXT",
+    "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS cached_up_to_message_id INTEGER",
+    "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS cached_message_count INTEGER DEFAULT 0",
+    "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS summary TEXT",
+    "ALTER TABLE conversations ADD COLUMN IF NOT EXISTS summary_upto_message_id INTEGER",
+    "CREATE INDEX IF NOT EXISTS ix_conversations_user_updated ON conversations (user_id, updated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_conv_id ON messages (conversation_id, id)",
+    "DROP INDEX IF EXISTS ix_messages_conv_created",
+)
+
 
-def get_db():
+async def get_db():
     """Dependency to get database session."""
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def init_db():
-    """Initialize database tables."""
-    Base.metadata.create_all(bind=engine)
+async def init_db():
+    """Initialize database tables and bring existing ones up to date."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        for statement in _SCHEMA_UPGRADES:
+            await conn.execute(text(statement))
@@ -1,7 +1,62 @@
 """Service for Google Generative AI (Gemini) integration."""
+import asyncio
+from itertools import chain
 import google.generativeai as genai
-from typing import List, Optional, AsyncGenerator
+from typing import Dict, List, Optional, AsyncGenerator, Set, Tuple
 from app.config.settings import settings
+from app.services.semantic_cache import SemanticCache
+
+# Transcript labels for message roles; unknown roles fall back to capitalize()
+_ROLE = {"user": "User", "assistant": "Assistant", "system": "System"}
+
+
+class _SharedStream:
+    """
+    Buffered chunks of one upstream response stream.
+    
+    Every subscriber gets all chunks from the start, so callers that join
+    while the response is being generated still see the whole reply.
+    """
+    
+    def __init__(self):
+        """Initialize an open stream with no chunks."""
+        self.chunks: List[str] = []
+        self.finished = False
+        self.error: Optional[Exception] = None
+        # Task feeding the stream; held here so it isn't garbage collected
+        self.producer: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+    
+    async def push(self, chunk: str) -> None:
+        """Append a chunk and wake subscribers."""
+        async with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+    
+    async def close(self, error: Optional[Exception] = None) -> None:
+        """Mark the stream finished, optionally with the error that ended it."""
+        async with self._changed:
+            self.finished = True
+            self.error = error
+            self._changed.notify_all()
+    
+    async def subscribe(self) -> AsyncGenerator[str, None]:
+        """Yield every chunk as it arrives, re-raising the producer's error."""
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.chunks) > sent or self.finished)
+                pending = self.chunks[sent:]
+                finished = self.finished
+            
+            for chunk in pending:
+                yield chunk
+            sent += len(pending)
+            
+            if finished:
+                if self.error is not None:
+                    raise self.error
+                return
 
 
 class GenAIService:
@@ -11,12 +66,27 @@ class GenAIService:
         """Initialize the service with API key."""
         genai.configure(api_key=settings.GOOGLE_API_KEY)
         self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
+        self.cache = SemanticCache(
+            max_entries=settings.RESPONSE_CACHE_SIZE,
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        )
+        # Model calls for prompts currently being generated, keyed by cache key
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Streams currently being generated, shared the same way
+        self._inflight_streams: Dict[str, _SharedStream] = {}
+        self._inflight_lock = asyncio.Lock()
+        # Background tasks indexing cached responses; held so they aren't collected
+        self._background: Set[asyncio.Task] = set()
+        # Cap concurrent model calls to stay under upstream rate limits
+        self._semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
     
     async def generate_response(
         self,
         messages: List[dict],
         temperature: float = 0.7,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        history: Optional[str] = None,
+        user_id: Optional[int] = None
     ) -> str:
         """
         Generate a response from the Gen AI model.
@@ -25,24 +95,39 @@ class GenAIService:
             messages: List of message dictionaries with 'role' and 'content'
             temperature: Controls randomness (0-1)
             max_tokens: Maximum tokens in response
+            history: Pre-formatted transcript of the turns preceding ``messages``
+            user_id: User the response is for; semantic cache hits are only
+                shared within one user, and skipped when this is None
             
         Returns:
             Generated response text
         """
         try:
             # Convert messages to prompt format for Gemini
-            prompt = self._format_messages_for_gemini(messages)
+            prompt = self._format_messages_for_gemini(messages, history)
             
-            # Generate response
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=temperature,
-                    max_output_tokens=max_tokens or 1024,
-                ),
+            key = self.cache.make_key(settings.GEMINI_MODEL, temperature, max_tokens, prompt)
+            scope, embedding, cached = await self._cache_lookup(
+                messages, history, key, temperature, max_tokens, user_id
             )
+            if cached is not None:
+                return cached
             
-            return response.text
+            # Concurrent identical prompts share a single model call, across
+            # users like the exact cache; the user-scoped lookup is done above
+            async with self._inflight_lock:
+                task = self._inflight.get(key)
+                if task is None:
+                    task = asyncio.create_task(
+                        self._generate(prompt, key, temperature, max_tokens)
+                    )
+                    self._inflight[key] = task
+                    task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            
+            # Shield so one caller going away doesn't cancel the others' result
+            response = await asyncio.shield(task)
+            await self._index(messages, history, key, response, scope, embedding)
+            return response
         except Exception as e:
             raise Exception(f"Error generating response: {str(e)}")
     
@@ -50,7 +135,9 @@ class GenAIService:
         self,
         messages: List[dict],
         temperature: float = 0.7,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        history: Optional[str] = None,
+        user_id: Optional[int] = None
     ) -> AsyncGenerator[str, None]:
         """
         Stream a response from the Gen AI model.
@@ -59,36 +146,249 @@ class GenAIService:
             messages: List of message dictionaries
             temperature: Controls randomness
             max_tokens: Maximum tokens
+            history: Pre-formatted transcript of the turns preceding ``messages``
+            user_id: User the response is for, scoping semantic cache hits
             
         Yields:
             Text chunks of the response
         """
         try:
-            prompt = self._format_messages_for_gemini(messages)
+            prompt = self._format_messages_for_gemini(messages, history)
+            
+            key = self.cache.make_key(settings.GEMINI_MODEL, temperature, max_tokens, prompt)
+            scope, embedding, cached = await self._cache_lookup(
+                messages, history, key, temperature, max_tokens, user_id
+            )
+            if cached is not None:
+                yield cached
+                return
+            
+            # Concurrent identical prompts share one upstream stream. It is
+            # produced by its own task, so it runs to completion (and is
+            # cached) even if every subscriber disconnects.
+            async with self._inflight_lock:
+                stream = self._inflight_streams.get(key)
+                if stream is None:
+                    stream = _SharedStream()
+                    stream.producer = asyncio.create_task(
+                        self._produce_stream(stream, prompt, key, temperature, max_tokens)
+                    )
+                    self._inflight_streams[key] = stream
+                    stream.producer.add_done_callback(
+                        lambda _: self._inflight_streams.pop(key, None)
+                    )
+            
+            async for chunk in stream.subscribe():
+                yield chunk
+            
+            if stream.chunks:
+                await self._index(messages, history, key, "".join(stream.chunks), scope, embedding)
+        except Exception as e:
+            raise Exception(f"Error streaming response: {str(e)}")
+    
+    async def _produce_stream(
+        self,
+        stream: _SharedStream,
+        prompt: str,
+        key: str,
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> None:
+        """Feed a shared stream from the model, caching the full response."""
+        error = None
+        try:
+            async with self._semaphore:
+                response = await self.model.generate_content_async(
+                    prompt,
+                    generation_config=genai.types.GenerationConfig(
+                        temperature=temperature,
+                        max_output_tokens=max_tokens or 1024,
+                    ),
+                    stream=True,
+                )
+                
+                async for chunk in response:
+                    if chunk.text:
+                        await stream.push(chunk.text)
             
-            response = self.model.generate_content(
+            if stream.chunks:
+                await self.cache.set(key, "".join(stream.chunks))
+        except Exception as e:
+            error = e
+        finally:
+            await stream.close(error)
+    
+    async def _generate(
+        self,
+        prompt: str,
+        key: str,
+        temperature: float,
+        max_tokens: Optional[int]
+    ) -> str:
+        """Answer a prompt with the model, caching the response."""
+        # Generate response off the event loop; the SDK call is blocking
+        async with self._semaphore:
+            response = await asyncio.to_thread(
+                self.model.generate_content,
                 prompt,
                 generation_config=genai.types.GenerationConfig(
                     temperature=temperature,
                     max_output_tokens=max_tokens or 1024,
                 ),
-                stream=True,
+            )
+        
+        await self.cache.set(key, response.text)
+        return response.text
+    
+    async def _cache_lookup(
+        self,
+        messages: List[dict],
+        history: Optional[str],
+        key: str,
+        temperature: float,
+        max_tokens: Optional[int],
+        user_id: Optional[int]
+    ) -> Tuple[Optional[str], Optional[List[float]], Optional[str]]:
+        """
+        Look up a cached response for a prompt.
+        
+        Tries an exact match on the full prompt first, then a semantic match
+        on the latest user message among the same user's cached queries that
+        share the same preceding conversation. Near matches can differ in
+        personal details, so semantic hits are never shared between users.
+        The message is only embedded if its scope has cached queries at all.
+        
+        Returns:
+            Tuple of (semantic scope, query embedding, cached response).
+            Scope is None when no semantic lookup was possible; embedding is
+            None when the lookup was skipped or embedding failed.
+        """
+        cached = await self.cache.get(key)
+        if (
+            cached is not None
+            or user_id is None
+            or not messages
+            or messages[-1].get("role") != "user"
+        ):
+            return None, None, cached
+        
+        scope = self.cache.make_key(
+            user_id,
+            settings.GEMINI_MODEL,
+            temperature,
+            max_tokens,
+            self.format_transcript(messages[:-1], history),
+        )
+        if not self.cache.has_scope(scope):
+            return scope, None, None
+        
+        embedding = await self._embed(messages[-1].get("content", ""))
+        if embedding is None:
+            return scope, None, None
+        
+        cached = await self.cache.get_similar(scope, embedding)
+        return scope, embedding, cached
+    
+    async def _index(
+        self,
+        messages: List[dict],
+        history: Optional[str],
+        key: str,
+        response: str,
+        scope: Optional[str],
+        embedding: Optional[List[float]]
+    ) -> None:
+        """
+        Index a cached model response for semantic lookups in ``scope``.
+        
+        A scope is a user's exact preceding conversation, which only recurs
+        for the opening message of a conversation. Other turns stay cached
+        for exact matches only. An opening message not embedded during the
+        lookup is embedded in the background, after the response is out.
+        """
+        if embedding is not None:
+            await self.cache.set(key, response, scope, embedding)
+            return
+        
+        if scope is None or history or len(messages) != 1:
+            return
+        
+        async def index():
+            query_embedding = await self._embed(messages[-1].get("content", ""))
+            if query_embedding is not None:
+                await self.cache.set(key, response, scope, query_embedding)
+        
+        task = asyncio.create_task(index())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        """Embed text for semantic cache lookups, or return None on failure."""
+        try:
+            result = await asyncio.to_thread(
+                genai.embed_content,
+                model=settings.GEMINI_EMBEDDING_MODEL,
+                content=text,
+                task_type="semantic_similarity",
+            )
+            return result["embedding"]
+        except Exception:
+            return None
+    
+    async def summarize(self, messages: List[dict], summary: Optional[str] = None) -> str:
+        """
+        Condense messages into a short running summary.
+        
+        Args:
+            messages: Messages to fold into the summary, oldest first
+            summary: Previous summary the messages follow on from
+            
+        Returns:
+            Updated summary text
+        """
+        try:
+            prompt = (
+                "Summarize the conversation below in a few sentences, keeping any "
+                "facts, names and decisions needed to continue it.\n"
+                + (f"Summary so far: {summary}\n" if summary else "")
+                + self.format_transcript(messages)
+                + "\nSummary:"
             )
             
-            for chunk in response:
-                if chunk.text:
-                    yield chunk.text
+            async with self._semaphore:
+                response = await asyncio.to_thread(
+                    self.model.generate_content,
+                    prompt,
+                    generation_config=genai.types.GenerationConfig(
+                        temperature=0.2,
+                        max_output_tokens=256,
+                    ),
+                )
+            
+            return response.text
         except Exception as e:
-            raise Exception(f"Error streaming response: {str(e)}")
+            raise Exception(f"Error summarizing conversation: {str(e)}")
+    
+    def format_transcript(self, messages: List[dict], history: Optional[str] = None) -> str:
+        """
+        Render messages as the plain-text transcript used in Gemini prompts.
+        
+        Args:
+            messages: List of message dictionaries
+            history: Already formatted transcript to append the messages to
+            
+        Returns:
+            Transcript with one "Role: content" entry per message
+        """
+        lines = (
+            f"{_ROLE.get(msg.get('role', 'user')) or msg['role'].capitalize()}: {msg.get('content', '')}"
+            for msg in messages
+        )
+        return "\n".join(chain((history,) if history else (), lines))
     
-    def _format_messages_for_gemini(self, messages: List[dict]) -> str:
+    def _format_messages_for_gemini(self, messages: List[dict], history: Optional[str] = None) -> str:
         """Convert message list to Gemini-compatible format."""
-        formatted = []
-        for msg in messages:
-            role = msg.get("role", "user")
-            content = msg.get("content", "")
-            formatted.append(f"{role.capitalize()}: {content}")
-        return "\n".join(formatted) + "\nAssistant:"
+        return self.format_transcript(messages, history) + "\nAssistant:"
 
 
 # Global service instance
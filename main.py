@@ -1,11 +1,67 @@
 """Main FastAPI application factory."""
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
 from app.config.settings import settings
-from app.config.database import init_db
+from app.config.database import engine, init_db
 from app.routes import auth_routes, chat_routes
 
 
+class _StreamAwareGZipResponder(GZipResponder):
+    """
+    GZip responder that passes ``text/event-stream`` responses through.
+    
+    The compressor buffers small writes, which would hold back SSE frames
+    until enough output accumulates.
+    """
+    
+    passthrough = False
+    
+    async def send_with_gzip(self, message):
+        """Compress the response unless its content type is an event stream."""
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            self.passthrough = content_type.startswith("text/event-stream")
+        
+        if self.passthrough:
+            await self.send(message)
+        else:
+            await super().send_with_gzip(message)
+
+
+class StreamAwareGZipMiddleware(GZipMiddleware):
+    """
+    GZip middleware that leaves Server-Sent Events streams uncompressed.
+    
+    Streams are recognized by their response content type, so any route
+    returning ``text/event-stream`` is sent as is.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        """Handle a request, compressing the response if the client accepts gzip."""
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _StreamAwareGZipResponder(
+                self.app, self.minimum_size, compresslevel=self.compresslevel
+            )
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create tables on startup and close pooled connections on shutdown."""
+    await init_db()
+    yield
+    await engine.dispose()
+
+
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
     
@@ -13,8 +69,14 @@ def create_app() -> FastAPI:
         title=settings.API_TITLE,
         version=settings.API_VERSION,
         description=settings.API_DESCRIPTION,
+        default_response_class=ORJSONResponse,
+        lifespan=lifespan,
     )
     
+    # Per-user rate limits on chat endpoints
+    app.state.limiter = chat_routes.limiter
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+    
     # Add CORS middleware
     app.add_middleware(
         CORSMiddleware,
@@ -24,8 +86,8 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
-    # Initialize database
-    init_db()
+    # Compress larger JSON payloads such as long message lists
+    app.add_middleware(StreamAwareGZipMiddleware, minimum_size=1024, compresslevel=5)
     
     # Include routers
     app.include_router(auth_routes.router)
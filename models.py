@@ -1,6 +1,6 @@
 """Database models for User, Conversation, and Message."""
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.config.database import Base
 
@@ -24,6 +24,10 @@ class User(Base):
 class Conversation(Base):
     """Conversation model to store chat sessions."""
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Serves "list a user's conversations, newest first" as an index scan
+        Index("ix_conversations_user_updated", "user_id", "updated_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -31,6 +35,15 @@ class Conversation(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Formatted prompt transcript, valid while it ends at cached_up_to_message_id
+    cached_prompt = Column(Text, nullable=True)
+    cached_up_to_message_id = Column(Integer, nullable=True)
+    cached_message_count = Column(Integer, default=0)
+    
+    # Running summary of messages that fell out of the history window
+    summary = Column(Text, nullable=True)
+    summary_upto_message_id = Column(Integer, nullable=True)
+    
     # Relationships
     user = relationship("User", back_populates="conversations")
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
@@ -39,6 +52,11 @@ class Conversation(Base):
 class Message(Base):
     """Message model to store chat history."""
     __tablename__ = "messages"
+    __table_args__ = (
+        # Messages are ordered and paged by ID, which follows insert order;
+        # created_at is set when a turn starts and concurrent turns interleave
+        Index("ix_messages_conv_id", "conversation_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
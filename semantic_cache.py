@@ -0,0 +1,121 @@
+"""Two-tier (exact + semantic) cache for Gen AI responses."""
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+import numpy as np
+
+
+class SemanticCache:
+    """
+    LRU cache of model responses.
+
+    Lookups first try an exact match on the hashed prompt, then fall back to
+    the most similar cached query embedding within the same scope (user,
+    model, generation settings and preceding conversation) whose cosine
+    similarity is at least ``threshold``.
+    """
+
+    def __init__(self, max_entries: int = 1024, threshold: float = 0.92):
+        """Initialize an empty cache holding at most ``max_entries`` responses."""
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._lock = asyncio.Lock()
+        # key -> (embedding slot or None, response), oldest first
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Normalized embeddings live in a preallocated matrix, one row per slot
+        self._matrix: Optional[np.ndarray] = None
+        self._slot_scopes = np.full(max_entries, None, dtype=object)
+        self._slot_keys: list = [None] * max_entries
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        # Number of indexed embeddings per scope
+        self._scope_counts: Dict[str, int] = {}
+
+    @staticmethod
+    def make_key(*parts: object) -> str:
+        """Build a stable cache key from the given parts."""
+        return hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()
+
+    def has_scope(self, scope: str) -> bool:
+        """Return whether any cached query is indexed under ``scope``."""
+        return scope in self._scope_counts
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the response cached under an exact key, if any."""
+        async with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    async def get_similar(self, scope: str, embedding: Sequence[float]) -> Optional[str]:
+        """Return the response for the closest cached query in ``scope``, if similar enough."""
+        async with self._lock:
+            if self._matrix is None:
+                return None
+
+            query = self._normalize(embedding)
+            if query.shape[0] != self._matrix.shape[1]:
+                return None
+
+            similarities = self._matrix @ query
+            similarities[self._slot_scopes != scope] = -1.0
+            slot = int(np.argmax(similarities))
+            if similarities[slot] < self.threshold:
+                return None
+
+            key = self._slot_keys[slot]
+            self._entries.move_to_end(key)
+            return self._entries[key][1]
+
+    async def set(
+        self,
+        key: str,
+        response: str,
+        scope: Optional[str] = None,
+        embedding: Optional[Sequence[float]] = None
+    ) -> None:
+        """Cache a response, optionally indexing its query embedding under ``scope``."""
+        async with self._lock:
+            if key in self._entries:
+                self._release(self._entries.pop(key)[0])
+
+            while len(self._entries) >= self.max_entries:
+                _, (slot, _) = self._entries.popitem(last=False)
+                self._release(slot)
+
+            slot = None
+            if scope is not None and embedding is not None:
+                vector = self._normalize(embedding)
+                if self._matrix is None:
+                    self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                if vector.shape[0] == self._matrix.shape[1]:
+                    slot = self._free_slots.pop()
+                    self._matrix[slot] = vector
+                    self._slot_scopes[slot] = scope
+                    self._slot_keys[slot] = key
+                    self._scope_counts[scope] = self._scope_counts.get(scope, 0) + 1
+
+            self._entries[key] = (slot, response)
+
+    def _release(self, slot: Optional[int]) -> None:
+        """Return an embedding slot to the free list."""
+        if slot is None:
+            return
+        scope = self._slot_scopes[slot]
+        if self._scope_counts[scope] == 1:
+            del self._scope_counts[scope]
+        else:
+            self._scope_counts[scope] -= 1
+        self._matrix[slot] = 0.0
+        self._slot_scopes[slot] = None
+        self._slot_keys[slot] = None
+        self._free_slots.append(slot)
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        """Convert an embedding to a unit-length float32 vector."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector